@@ -12,20 +12,23 @@ Author: Andrew Qiu (GitHub @andrewcoool)
 """
 
 
-import logging
-import colorlog
-from typing import List, Iterator, Dict
-from transform import Operation, xform_multiple
+import queue
+import threading
+from array import array
+from collections import deque
+from typing import Callable, List, Dict, Optional, Tuple
+from rope import Rope
+import orjson
+from transform import ID, DeleteOperation, IdentityOperation, InsertOperation, \
+    Operation, xform_multiple
+from json_cache import JsonCache
+from logging_config import get_logger
 
-# Add Color
-handler = colorlog.StreamHandler()
-handler.setFormatter(colorlog.ColoredFormatter(
-    '%(log_color)s%(levelname)-8s%(reset)s %(yellow)s%(message)s',
-))
+logger = get_logger(__name__)
 
-logger = colorlog.getLogger(__name__)
-logger.addHandler(handler)
-logger.setLevel(logging.DEBUG)
+# The number of revisions every client must have moved past
+# before they are dropped from a document's history
+COMPACTION_THRESHOLD = 256
 
 
 class Revision:
@@ -39,6 +42,8 @@ class Revision:
                         parent document
     """
 
+    __slots__ = ('changes', 'author', 'revision_num')
+
     changes: List[Operation]
     author: str
     revision_num: int
@@ -53,43 +58,130 @@ class Revision:
 class Text:
     """Class representing the text of a document."""
 
-    _text: List[List[str]]
+    __slots__ = ('_rope', '_cache', '_dispatch')
+
+    # Private Instance Attributes:
+    #   - _rope: the rope storing the characters of the text
+    #   - _cache: the raw string text, or None if the text
+    #             has changed since it was last computed
+    #   - _dispatch: the method applying each kind of operation,
+    #                indexed by the kind
+    _rope: Rope
+    _cache: Optional[str]
+    _dispatch: Tuple[Callable[[Operation], Optional[Tuple[int, Optional[str]]]], ...]
 
     def __init__(self) -> None:
         """Initialize the text"""
-        self._text = [[]]
+        self._rope = Rope()
+        self._cache = ''
+        self._dispatch = (self._apply_insert, self._apply_delete, self._apply_identity)
 
     def get_text(self) -> str:
         """Return the raw string text"""
-        return '\n'.join([''.join(row) for row in self._text])
+        if self._cache is None:
+            self._cache = self._rope.get_text()
+
+        return self._cache
 
     def apply(self, operation: Operation) -> None:
         """Applies an operation onto the text"""
-        identity = operation.get_identity()
+        self._dispatch[operation.kind](operation)
+
+    def apply_all(self, operations: List[Operation]) -> None:
+        """Applies operations onto the text in order, all or none.
+
+        Raise IndexError if any operation is not in the text, after
+        undoing the operations before it.
+        """
+
+        undos = []
+
+        try:
+            for operation in operations:
+                undos.append(self._dispatch[operation.kind](operation))
+        except IndexError:
+            for undo in reversed(undos):
+                if undo is None:
+                    continue
+
+                offset, character = undo
+                if character is None:
+                    self._rope.delete(offset, 1)
+                else:
+                    self._rope.insert(offset, character)
+            raise
+
+    def _apply_insert(self, operation: InsertOperation) -> Tuple[int, None]:
+        """Applies an insert operation onto the text and return
+        (offset, None) to undo it by deleting at offset.
+
+        Raise IndexError if the position is not in the text.
+        """
+
+        start, end = self._get_row_bounds(operation.position.row)
+        offset = start + operation.position.column
+
+        if not start <= offset <= end:
+            raise IndexError(f'Cannot insert at {operation.position}')
+
+        self._rope.insert(offset, operation.character)
+        self._cache = None
+        return offset, None
+
+    def _apply_delete(self, operation: DeleteOperation) -> Tuple[int, str]:
+        """Applies a delete operation onto the text and return
+        (offset, character) to undo it by inserting character at offset.
+
+        Raise IndexError if there is no character at the position.
+        """
+
+        start, end = self._get_row_bounds(operation.position.row)
+
+        if operation.position.column == -1 and operation.position.row > 0:
+            # Delete the newline joining the row to the previous
+            offset = start - 1
+        elif 0 <= operation.position.column < end - start:
+            offset = start + operation.position.column
+        else:
+            raise IndexError(f'Cannot delete at {operation.position}')
+
+        character = self._rope.get_char(offset)
+        self._rope.delete(offset, 1)
+        self._cache = None
+        return offset, character
+
+    def _get_row_bounds(self, row: int) -> Tuple[int, int]:
+        """Return the offsets of the first character of a row
+        and of the newline (or end of text) ending it.
+
+        Raise IndexError if the row is not in the text.
+        """
+
+        start = self._rope.get_line_start(row)
 
-        if identity == 'INS':
-            if operation.character == '\n':
-                left = self._text[operation.position.row][:operation.position.column]
-                right = self._text[operation.position.row][operation.position.column:]
+        if row == self._rope.count_newlines():
+            return start, len(self._rope)
 
-                self._text[operation.position.row] = left
-                self._text.insert(operation.position.row + 1, right)
-            else:
-                self._text[operation.position.row].insert(
-                    operation.position.column, operation.character)
+        return start, self._rope.get_line_start(row + 1) - 1
 
-        elif identity == 'DEL':
-            if operation.position.column == -1:
-                # Delete row and append to the previous
-                row = self._text.pop(operation.position.row)
-                self._text[operation.position.row - 1].extend(row)
-            else:
-                self._text[operation.position.row].pop(operation.position.column)
+    def _apply_identity(self, operation: IdentityOperation) -> None:
+        """Applies an identity operation, which leaves the text
+        unchanged and so has nothing to undo.
+        """
 
 
 class Document:
     """Class representing a text document
 
+    Submissions, joins and leaves are queued and handled one at a time
+    by the document's writer thread, which is the only thread that
+    modifies the document. Under the server's gevent backend the writer
+    is a greenlet: it keeps handlers from interleaving their changes,
+    but it shares the OS thread with them, so the transformation work
+    still holds up other connections while it runs. Handlers only read
+    the document, which relies on the writer never being pre-empted
+    partway through a task, as is the case for green threads.
+
     Instance Attributes:
         - clients: mapping that maps an author's id
                    to their last reported revision
@@ -98,22 +190,75 @@ class Document:
     clients: Dict[str, int]
 
     # Private Instance Attributes:
-    #   - _revisions: a list of all revisions made in the document
+    #   - _changes: the changes of every revision in the document,
+    #               stored contiguously in order
+    #   - _revision_starts: the index in _changes of the first change
+    #                       of each revision
+    #   - _authors: the author of each revision
+    #   - _base_revision: the revision_num of the oldest revision still
+    #                     stored; older revisions have been compacted
+    #                     into the text
     #   - _text: the Text instance representing the text in the document
-    _revisions: List[Revision]
+    #   - _json_cache: the JSON of the changes since recently requested
+    #                  revisions, cleared whenever a revision is added
+    #   - _queue: the (task, author, arguments) waiting to be run
+    #             by the writer thread, or None to stop it
+    #   - _writer: the writer thread
+    #   - _pending_joins: the revision_nums of the joins still in _queue,
+    #                     oldest first, which compaction must keep
+    #   - _join_lock: the lock keeping compaction from running between
+    #                 a join reading its revision_num and recording it
+    _changes: List[Operation]
+    _revision_starts: array
+    _authors: List[str]
+    _base_revision: int
     _text: Text
+    _json_cache: JsonCache
+    _queue: queue.Queue
+    _writer: threading.Thread
+    _pending_joins: deque
+    _join_lock: threading.Lock
 
     def __init__(self) -> None:
         """Initialize the document"""
 
-        self._revisions = []
+        self._changes = []
+        self._revision_starts = array('I')
+        self._authors = []
+        self._base_revision = 0
         # SESSION_ID -> LAST_REVISION
         self.clients = {}
         self._text = Text()
+        self._json_cache = JsonCache()
+
+        # A single writer thread runs every queued task in order,
+        # so handlers never modify the document concurrently
+        self._queue = queue.Queue()
+        self._pending_joins = deque()
+        self._join_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._run_writer, daemon=True)
+        self._writer.start()
 
     def get_revision(self, revision_num: int) -> Revision:
-        """Return the revision given a revision_num"""
-        return self._revisions[revision_num]
+        """Return the revision given a revision_num.
+
+        Raise ValueError if the revision has been compacted.
+        """
+
+        index = revision_num - self._base_revision
+
+        if index < 0:
+            raise ValueError(f'Revision {revision_num} has been compacted')
+
+        start = self._revision_starts[index]
+
+        if revision_num == self.get_last_revision_num():
+            changes = self._changes[start:]
+        else:
+            changes = self._changes[start:self._revision_starts[index + 1]]
+
+        return Revision(changes=changes, author=self._authors[index],
+                        revision_num=revision_num)
 
     def get_text(self) -> str:
         """Get the raw string text of the document"""
@@ -121,24 +266,42 @@ class Document:
 
     def get_last_revision_num(self) -> int:
         """Return the revision_num of the last revision"""
-        return len(self._revisions) - 1
+        return self._base_revision + len(self._revision_starts) - 1
 
     def is_on_latest_revision(self, author: str) -> bool:
         """Return whether or not the author is on the latest revision
         already.
         """
 
-        return self.get_last_revision_num() == self.clients[author]
+        return self.get_last_revision_num() == self.clients.get(author)
 
-    def get_changes_since_revision_num(self, revision_num: int) -> Iterator[Operation]:
-        """(Generator) Yield all the changes since a revision_num"""
+    def get_changes_since_revision_num(self, revision_num: int) -> List[Operation]:
+        """Return all the changes since a revision_num.
 
-        rev_range = range(revision_num + 1, self.get_last_revision_num() + 1)
+        Raise ValueError if any of those changes have been compacted.
+        """
+
+        index = revision_num + 1 - self._base_revision
+
+        if index < 0:
+            raise ValueError(f'Changes since revision {revision_num} have been compacted')
+        elif index >= len(self._revision_starts):
+            return []
+
+        return self._changes[self._revision_starts[index]:]
+
+    def get_changes_since_json(self, revision_num: int) -> str:
+        """Return the list structures of all the changes since
+        a revision_num as JSON.
+
+        Clients updating from the same revision share one payload.
+        Raise ValueError if any of those changes have been compacted.
+        """
 
-        for i in rev_range:
-            rev = self._revisions[i]
-            for change in rev.changes:
-                yield change
+        return self._json_cache.get(
+            revision_num,
+            lambda: [change.get_list_structure()
+                     for change in self.get_changes_since_revision_num(revision_num)])
 
     def add_revision(self, changes: List[Operation], author: str) -> int:
         """Add a new revision to the document given an author
@@ -146,15 +309,156 @@ class Document:
         """
 
         revision_num = self.get_last_revision_num() + 1
-        self._revisions.append(Revision(
-            changes=changes, author=author, revision_num=revision_num))
+        self._revision_starts.append(len(self._changes))
+        self._authors.append(author)
+        self._changes.extend(changes)
+        self._json_cache.clear()
+
+        self._compact()
+
         return revision_num
 
+    def _compact(self) -> None:
+        """Drop the revisions that every client has already moved past
+        once there are more than COMPACTION_THRESHOLD of them.
+
+        Their changes are already applied to the text, and no client
+        will ask for changes since a revision older than its own.
+        Clients whose joins are still queued count as on the
+        revision they joined at.
+        """
+
+        with self._join_lock:
+            oldest_client = min(self.clients.values(), default=self.get_last_revision_num())
+
+            if self._pending_joins:
+                # Joins are queued in order, so the first is the oldest
+                oldest_client = min(oldest_client, self._pending_joins[0])
+
+            num_dropped = oldest_client - self._base_revision + 1
+
+            if num_dropped <= COMPACTION_THRESHOLD:
+                return
+
+            cut = self._revision_starts[num_dropped] \
+                if num_dropped < len(self._revision_starts) else len(self._changes)
+
+            del self._changes[:cut]
+            del self._authors[:num_dropped]
+            self._revision_starts = array('I', [start - cut for start in
+                                                self._revision_starts[num_dropped:]])
+            self._base_revision += num_dropped
+
     def apply_changes(self, changes: List[Operation]) -> None:
-        """Apply changes to the text of the document"""
+        """Apply changes to the text of the document, all or none.
+
+        Raise IndexError if any change is not in the text.
+        """
+
+        self._text.apply_all(changes)
+
+    def submit_changes(self, changes: List[list], author: str,
+                       callback: Callable[[str], None]) -> None:
+        """Queue changes made by a client, as the list structures they
+        were received in, to be added by the writer thread and return
+        immediately. Once added, callback is called with the changes
+        the client needs to make on their end as JSON.
+        """
+
+        self._queue.put((self._reply_to_changes, author, (changes, callback)))
+
+    def submit_join(self, author: str) -> None:
+        """Queue a client to be tracked from the current latest
+        revision and return immediately.
+
+        The revision is read now rather than by the writer thread, as
+        submissions queued ahead of the join are not on the client's page.
+        Until the writer reaches the join, that revision is kept from
+        being compacted.
+        """
+
+        with self._join_lock:
+            revision_num = self.get_last_revision_num()
+            self._pending_joins.append(revision_num)
+
+        self._queue.put((self._add_client, author, (revision_num,)))
+
+    def submit_leave(self, author: str) -> None:
+        """Queue a client to no longer be tracked once the
+        writer thread reaches it, and return immediately.
+
+        An untracked client no longer holds back compaction.
+        """
+
+        self._queue.put((self._remove_client, author, ()))
+
+    def close(self) -> None:
+        """Stop the writer thread once it has run every task
+        queued so far, and wait for it to finish.
+        """
+
+        self._queue.put(None)
+        self._writer.join()
 
-        for change in changes:
-            self._text.apply(change)
+    def _run_writer(self) -> None:
+        """Run queued tasks one at a time until the document is closed."""
+
+        while True:
+            item = self._queue.get()
+
+            if item is None:
+                return
+
+            task, author, arguments = item
+
+            try:
+                task(author, *arguments)
+            except Exception:
+                # Keep serving other clients if one submission fails
+                logger.exception(f'Could not process a submission from {author}.')
+
+    def _reply_to_changes(self, author: str, changes: List[list],
+                          callback: Callable[[str], None]) -> None:
+        """Add changes made by a client and call callback with the
+        changes the client needs to make on their end as JSON.
+        """
+
+        callback(self.add_changes_raw(changes, author))
+
+    def _add_client(self, author: str, revision_num: int) -> None:
+        """Track a client from the revision_num of its queued join"""
+        self.clients[author] = revision_num
+        self._pending_joins.popleft()
+
+    def _remove_client(self, author: str) -> None:
+        """Stop tracking a client"""
+        self.clients.pop(author, None)
+
+    def add_changes_raw(self, changes: List[list], author: str) -> str:
+        """Add changes made by a client, given as the list structures
+        received from the client, and return the changes the client
+        needs to make on their end as JSON.
+
+        Raise ValueError if a change is not an INS or DEL.
+        """
+
+        # Parsed here rather than by the socket handler so that
+        # building the operations happens on the writer thread
+        return self.add_changes_json(Operation.from_lists(changes, author), author)
+
+    def add_changes_json(self, changes: List[Operation], author: str) -> str:
+        """Add changes made by a client and return the changes the
+        client needs to make on their end as JSON.
+        """
+
+        if len(changes) == 0:
+            # The author is only updating to the latest version,
+            # which other clients on the same revision may have asked for
+            payload = self.get_changes_since_json(self.clients[author])
+            self.clients[author] = self.get_last_revision_num()
+            return payload
+
+        return orjson.dumps(self.add_changes(changes, author)).decode()
 
     def add_changes(self, changes: List[Operation], author: str) -> List[list]:
         """Add changes made by a client and return the changes the
@@ -166,7 +470,7 @@ class Document:
         # revisions
         base = self.clients[author]
 
-        changes_since = list(self.get_changes_since_revision_num(base))
+        changes_since = self.get_changes_since_revision_num(base)
 
         if len(changes) == 0:
             # The author has made no changes to the document
@@ -175,12 +479,26 @@ class Document:
             return [change.get_list_structure()
                     for change in changes_since]
 
-        # Transform changes to resend back to client
-        # and for the server to re-assume same document state
-        changes_for_client, changes_for_server = xform_multiple(changes, changes_since)
-
-        new_revision_num = self.add_revision(changes_for_server, author)
+        if len(changes_since) == 0:
+            # Nothing happened concurrently, so the changes
+            # apply as they are and the client is up to date
+            changes_for_client, changes_for_server = [], changes
+        else:
+            # Transform changes to resend back to client
+            # and for the server to re-assume same document state
+            changes_for_client, changes_for_server = xform_multiple(changes, changes_since)
+
+            # Identity operations leave the text unchanged and transform
+            # nothing, so keep them out of the history and the reply
+            changes_for_client = [change for change in changes_for_client
+                                  if change.kind != ID]
+            changes_for_server = [change for change in changes_for_server
+                                  if change.kind != ID]
+
+        # Apply before adding the revision so that a revision_num
+        # is only seen once the text includes its changes
         self.apply_changes(changes_for_server)
+        new_revision_num = self.add_revision(changes_for_server, author)
         self.clients[author] = new_revision_num
 
         return [change.get_list_structure()
@@ -13,7 +13,9 @@ Author: Andrew Qiu (GitHub @andrewcoool)
 """
 
 
-from typing import Dict, List, Iterator
+from array import array
+from typing import Dict, List
+from json_cache import JsonCache
 
 
 class Revision:
@@ -27,6 +29,8 @@ class Revision:
                         parent document
     """
 
+    __slots__ = ('changes', 'author', 'revision_num')
+
     changes: List[list]
     author: str
     revision_num: int
@@ -42,24 +46,43 @@ class Drawing:
     clients: Dict[str, int]
 
     # Private Instance Attributes:
-    #   - _revisions: a list of all revisions made in the document
-    #   - _text: the Text instance representing the text in the document
-    _revisions: List[Revision]
+    #   - _changes: the changes of every revision in the drawing,
+    #               stored contiguously in order
+    #   - _revision_starts: the index in _changes of the first change
+    #                       of each revision
+    #   - _authors: the author of each revision
+    #   - _json_cache: the JSON of the changes since recently requested
+    #                  revisions, cleared whenever a revision is added
+    _changes: List[list]
+    _revision_starts: array
+    _authors: List[str]
+    _json_cache: JsonCache
 
     def __init__(self):
         """Initialize the Drawing"""
 
-        self._revisions = []
+        self._changes = []
+        self._revision_starts = array('I')
+        self._authors = []
+        self._json_cache = JsonCache()
         # SESSION_ID -> LAST_REVISION
         self.clients = {}
 
     def get_revision(self, revision_num: int) -> Revision:
         """Return the revision given a revision_num"""
-        return self._revisions[revision_num]
+        start = self._revision_starts[revision_num]
+
+        if revision_num == self.get_last_revision_num():
+            changes = self._changes[start:]
+        else:
+            changes = self._changes[start:self._revision_starts[revision_num + 1]]
+
+        return Revision(changes=changes, author=self._authors[revision_num],
+                        revision_num=revision_num)
 
     def get_last_revision_num(self) -> int:
         """Return the revision_num of the last revision"""
-        return len(self._revisions) - 1
+        return len(self._revision_starts) - 1
 
     def is_on_latest_revision(self, author: str) -> bool:
         """Return whether or not the author is on the latest revision
@@ -68,15 +91,22 @@ class Drawing:
 
         return self.get_last_revision_num() == self.clients[author]
 
-    def get_changes_since_revision_num(self, revision_num: int) -> Iterator[list]:
-        """(Generator) Yield all the changes since a revision_num"""
+    def get_changes_since_revision_num(self, revision_num: int) -> List[list]:
+        """Return all the changes since a revision_num"""
+
+        if revision_num >= self.get_last_revision_num():
+            return []
 
-        rev_range = range(revision_num + 1, self.get_last_revision_num() + 1)
+        return self._changes[self._revision_starts[revision_num + 1]:]
 
-        for i in rev_range:
-            rev = self._revisions[i]
-            for change in rev.changes:
-                yield change
+    def get_changes_since_json(self, revision_num: int) -> str:
+        """Return all the changes since a revision_num as JSON.
+
+        Clients catching up from the same revision share one payload.
+        """
+
+        return self._json_cache.get(revision_num,
+                                    lambda: self.get_changes_since_revision_num(revision_num))
 
     def add_revision(self, changes: List[list], author: str) -> int:
         """Add a new revision to the document given an author
@@ -84,17 +114,24 @@ class Drawing:
         """
 
         revision_num = self.get_last_revision_num() + 1
-        self._revisions.append(Revision(
-            changes=changes, author=author, revision_num=revision_num))
+        self._revision_starts.append(len(self._changes))
+        self._authors.append(author)
+        self._changes.extend(changes)
+        self._json_cache.clear()
         return revision_num
 
-    def add_changes(self, changes: List[list], author: str) -> List[list]:
+    def add_changes_json(self, changes: List[list], author: str) -> str:
         """Add changes made by a client and return the changes the
-        client needs to make on their end.
+        client needs to make on their end as JSON.
         """
 
-        base = self.clients[author]
-        changes_since = list(self.get_changes_since_revision_num(base))
+        changes_since = self.get_changes_since_json(self.clients[author])
+
+        if len(changes) == 0:
+            # The author is only updating to the latest version, so no
+            # revision is added and the cached payload stays shared
+            self.clients[author] = self.get_last_revision_num()
+            return changes_since
 
         new_revision_num = self.add_revision(changes, author)
         self.clients[author] = new_revision_num
@@ -12,9 +12,8 @@ and the LICENSE file for more information.
 Author: Andrew Qiu (GitHub @andrewcoool)
 """
 
-from typing import Dict, Iterator, List, Tuple
-import random
-import string
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import itertools
 import document
 import drawing
 
@@ -33,12 +32,14 @@ class Editor:
     # Private Instance Attribute
     # _clients: a mapping that maps the session id of a client
     #           to their nickname (alias) and colour
-    # _colors: a list of the colors available for users
-    # _color_index: stores the index of the color chosen
-    #               for the next client added
+    # _color_cycle: an endless iterator over the colors
+    #               available for users, in the order they are given out
+    # _page: the last rendered page of the editor
+    # _page_revision: the revision_num of the document when _page was rendered
     _clients: Dict[str, Tuple[str, str]]
-    _colors: List[str]
-    _color_index: int
+    _color_cycle: Iterator[str]
+    _page: str
+    _page_revision: Optional[int]
 
     def __init__(self):
         """Initialize the editor"""
@@ -49,18 +50,34 @@ class Editor:
         self.drawing = drawing.Drawing()
 
         self._clients = {}
-        self._colors = ['#AAFF00', '#FFAA00', '#FF00AA', '#AA00FF', '#00AAFF']
-        self._color_index = 0
+        self._color_cycle = itertools.cycle(
+            ['#AAFF00', '#FFAA00', '#FF00AA', '#AA00FF', '#00AAFF'])
+
+        self._page = ''
+        self._page_revision = None
+
+    def get_page(self, render: Callable[[str], str]) -> str:
+        """Return the page of the editor showing the document.
+
+        render is called with the text of the document to render
+        the page, only if the document has changed since the
+        page was last rendered.
+        """
+
+        revision_num = self.document.get_last_revision_num()
+
+        if revision_num != self._page_revision:
+            self._page = render(self.document.get_text())
+            self._page_revision = revision_num
+
+        return self._page
 
     def get_clients_state(self) -> Iterator[List[str]]:
         """(Generator) Yield an iterator with a list
         in the format [alias, color]
         """
 
-        for session_id in self._clients:
-            alias = self._clients[session_id][0]
-            color = self._clients[session_id][1]
-
+        for alias, color in self._clients.values():
             yield [alias, color]
 
     def does_client_exist(self, session_id: str) -> bool:
@@ -83,19 +100,4 @@ class Editor:
 
     def get_next_color(self):
         """Return the next color for a new client"""
-        new_color = self._colors[self._color_index]
-        self._color_index = (self._color_index + 1) % len(self._colors)
-
-        return new_color
-
-
-def get_random_string(length: int) -> str:
-    """Return a random string of a given length.
-
-    Paramters:
-        - length: the length of the string to be generated
-    """
-    select = string.ascii_lowercase + string.ascii_uppercase + string.digits
-    result_str = ''.join(random.choice(select) for _ in range(length))
-
-    return result_str
+        return next(self._color_cycle)
@@ -0,0 +1,52 @@
+"""Module with the JsonCache class, which keeps the
+JSON payloads of the changes since each requested revision.
+
+Copyright and Usage Information
+===============================
+
+This project and file is licensed with the MIT License.
+See https://github.com/andrewcoool/collaborate-code/
+and the LICENSE file for more information.
+
+Author: Andrew Qiu (GitHub @andrewcoool)
+"""
+
+from typing import Callable, Dict
+import orjson
+
+
+class JsonCache:
+    """Class representing a cache of JSON payloads, keyed
+    by the revision the changes they hold come after.
+
+    A payload holds every change up to the latest revision,
+    so the cache must be cleared whenever a revision is added.
+    """
+
+    # Private Instance Attributes:
+    #   - _payloads: mapping that maps a revision_num to the JSON of
+    #                the changes since that revision
+    _payloads: Dict[int, str]
+
+    def __init__(self) -> None:
+        """Initialize the cache"""
+        self._payloads = {}
+
+    def get(self, since: int, build: Callable[[], list]) -> str:
+        """Return the JSON of the changes since revision since.
+
+        If the payload is not cached, build is called to
+        get the changes to encode.
+        """
+
+        payload = self._payloads.get(since)
+
+        if payload is None:
+            payload = orjson.dumps(build()).decode()
+            self._payloads[since] = payload
+
+        return payload
+
+    def clear(self) -> None:
+        """Drop every payload, as a revision has been added"""
+        self._payloads.clear()
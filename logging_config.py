@@ -0,0 +1,50 @@
+"""Module that configures the loggers
+of the collaborate-code project.
+
+The level of every logger is WARNING unless set
+with the COLLAB_LOG environment variable (e.g. COLLAB_LOG=debug).
+
+Copyright and Usage Information
+===============================
+
+This project and file is licensed with the MIT License.
+See https://github.com/andrewcoool/collaborate-code/
+and the LICENSE file for more information.
+
+Author: Andrew Qiu (GitHub @andrewcoool)
+"""
+
+import logging
+import os
+import colorlog
+
+# The level of the project's loggers; getLevelName maps a level's
+# name to its number and returns a string for anything else
+LEVEL = logging.getLevelName(os.environ.get('COLLAB_LOG', 'WARNING').upper())
+
+if not isinstance(LEVEL, int):
+    LEVEL = logging.WARNING
+
+# Add Color
+_handler = colorlog.StreamHandler()
+_handler.setFormatter(colorlog.ColoredFormatter(
+    '%(log_color)s%(levelname)-8s%(reset)s %(yellow)s%(message)s',
+))
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return the logger with the given name, writing
+    coloured messages at the configured level.
+    """
+
+    logger = colorlog.getLogger(name)
+
+    if _handler not in logger.handlers:
+        logger.addHandler(_handler)
+
+    logger.setLevel(LEVEL)
+
+    # Keep messages from being written again by a root handler
+    logger.propagate = False
+
+    return logger
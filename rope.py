@@ -0,0 +1,278 @@
+"""Module with the Rope class, a balanced tree
+of string chunks used to store the text of a document.
+
+Copyright and Usage Information
+===============================
+
+This project and file is licensed with the MIT License.
+See https://github.com/andrewcoool/collaborate-code/
+and the LICENSE file for more information.
+
+Author: Andrew Qiu (GitHub @andrewcoool)
+"""
+
+from typing import List, Optional
+
+# The target number of characters held by a single leaf
+LEAF_SIZE = 1024
+
+# How much deeper than a perfectly balanced tree
+# the rope may grow before it is rebuilt
+_DEPTH_SLACK = 4
+
+
+class _Node:
+    """Class representing a node of a rope.
+
+    A node is either a leaf holding a chunk of text,
+    or an internal node with exactly two children.
+
+    Instance Attributes:
+        - text: the chunk of text held by the node ('' if internal)
+        - left: the left child of the node (None if leaf)
+        - right: the right child of the node (None if leaf)
+        - length: the number of characters in the subtree
+        - newlines: the number of newline characters in the subtree
+        - depth: the height of the subtree (0 if leaf)
+    """
+
+    __slots__ = ('text', 'left', 'right', 'length', 'newlines', 'depth')
+
+    text: str
+    left: Optional['_Node']
+    right: Optional['_Node']
+    length: int
+    newlines: int
+    depth: int
+
+    def __init__(self, text: str = '', left: Optional['_Node'] = None,
+                 right: Optional['_Node'] = None) -> None:
+        """Initialize the node"""
+        self.text = text
+        self.left = left
+        self.right = right
+        self.update()
+
+    def is_leaf(self) -> bool:
+        """Return whether or not the node is a leaf"""
+        return self.left is None
+
+    def update(self) -> None:
+        """Recompute the cached attributes of the node
+        from its text or its children.
+        """
+
+        if self.left is None:
+            self.length = len(self.text)
+            self.newlines = self.text.count('\n')
+            self.depth = 0
+        else:
+            self.length = self.left.length + self.right.length
+            self.newlines = self.left.newlines + self.right.newlines
+            self.depth = max(self.left.depth, self.right.depth) + 1
+
+
+class Rope:
+    """Class representing a string stored as a balanced
+    binary tree of chunks. Insertions, deletions and
+    row lookups take O(log n) time.
+    """
+
+    __slots__ = ('_root',)
+
+    # Private Instance Attributes:
+    #   - _root: the root node of the tree
+    _root: _Node
+
+    def __init__(self, text: str = '') -> None:
+        """Initialize the rope with the given text"""
+        self._root = _build(text)
+
+    def __len__(self) -> int:
+        return self._root.length
+
+    def count_newlines(self) -> int:
+        """Return the number of newline characters in the rope"""
+        return self._root.newlines
+
+    def get_text(self) -> str:
+        """Return the raw string text stored in the rope"""
+        chunks = []
+        stack = [self._root]
+
+        # In-order walk of the leaves
+        while stack:
+            node = stack.pop()
+            if node.is_leaf():
+                chunks.append(node.text)
+            else:
+                stack.append(node.right)
+                stack.append(node.left)
+
+        # Join sizes the result once and copies each chunk into it
+        return ''.join(chunks)
+
+    def get_char(self, offset: int) -> str:
+        """Return the character at offset.
+
+        Raise IndexError if offset is not in the rope.
+        """
+
+        if not 0 <= offset < self._root.length:
+            raise IndexError(f'Offset {offset} is out of range')
+
+        node = self._root
+
+        while not node.is_leaf():
+            if offset < node.left.length:
+                node = node.left
+            else:
+                offset -= node.left.length
+                node = node.right
+
+        return node.text[offset]
+
+    def get_line_start(self, row: int) -> int:
+        """Return the offset of the first character of a row.
+
+        Raise IndexError if the row is not in the rope.
+        """
+
+        if not 0 <= row <= self._root.newlines:
+            raise IndexError(f'Row {row} is out of range')
+
+        if row == 0:
+            return 0
+
+        node = self._root
+        offset = 0
+
+        # Find the leaf holding the row-th newline
+        while not node.is_leaf():
+            if row <= node.left.newlines:
+                node = node.left
+            else:
+                row -= node.left.newlines
+                offset += node.left.length
+                node = node.right
+
+        index = -1
+        for _ in range(row):
+            index = node.text.index('\n', index + 1)
+
+        return offset + index + 1
+
+    def insert(self, offset: int, text: str) -> None:
+        """Insert text so that it begins at offset.
+
+        Raise IndexError if offset is not in the rope.
+        """
+
+        if not 0 <= offset <= self._root.length:
+            raise IndexError(f'Offset {offset} is out of range')
+
+        self._root = _insert(self._root, offset, text)
+
+        # Rebuild if repeated splits have unbalanced the tree
+        leaves = self._root.length // LEAF_SIZE + 1
+        if self._root.depth > leaves.bit_length() + _DEPTH_SLACK:
+            self._root = _build(self.get_text())
+
+    def delete(self, offset: int, length: int) -> None:
+        """Delete length characters beginning at offset.
+
+        Raise IndexError if any of those characters are not in the rope.
+        """
+
+        if offset < 0 or length < 0 or offset + length > self._root.length:
+            raise IndexError(f'Cannot delete {length} characters at offset {offset}')
+
+        root = _delete(self._root, offset, length)
+
+        if root is None:
+            root = _Node()
+
+        self._root = root
+
+
+def _build(text: str) -> _Node:
+    """Return the root of a balanced tree holding text"""
+    chunks = [text[i:i + LEAF_SIZE] for i in range(0, len(text), LEAF_SIZE)]
+
+    if not chunks:
+        return _Node()
+
+    return _build_chunks(chunks, 0, len(chunks))
+
+
+def _build_chunks(chunks: List[str], start: int, end: int) -> _Node:
+    """Return the root of a balanced tree whose leaves
+    are chunks[start:end].
+    """
+
+    if end - start == 1:
+        return _Node(chunks[start])
+
+    mid = (start + end) // 2
+    return _Node(left=_build_chunks(chunks, start, mid),
+                 right=_build_chunks(chunks, mid, end))
+
+
+def _insert(node: _Node, offset: int, text: str) -> _Node:
+    """Insert text at offset into the subtree rooted at node
+    and return the new root of the subtree.
+    """
+
+    if node.is_leaf():
+        chunk = node.text[:offset] + text + node.text[offset:]
+
+        # Split leaves that have grown too large
+        if len(chunk) > 2 * LEAF_SIZE:
+            return _build(chunk)
+
+        node.text = chunk
+        node.update()
+        return node
+
+    if offset <= node.left.length:
+        node.left = _insert(node.left, offset, text)
+    else:
+        node.right = _insert(node.right, offset - node.left.length, text)
+
+    node.update()
+    return node
+
+
+def _delete(node: _Node, offset: int, length: int) -> Optional[_Node]:
+    """Delete length characters beginning at offset from the
+    subtree rooted at node and return the new root of the subtree,
+    or None if the subtree is now empty.
+    """
+
+    if node.is_leaf():
+        node.text = node.text[:offset] + node.text[offset + length:]
+
+        if node.text == '':
+            return None
+
+        node.update()
+        return node
+
+    left_length = node.left.length
+    end = offset + length
+
+    if offset < left_length:
+        node.left = _delete(node.left, offset, min(end, left_length) - offset)
+
+    if end > left_length:
+        start = max(offset, left_length)
+        node.right = _delete(node.right, start - left_length, end - start)
+
+    # Collapse internal nodes that lost a child
+    if node.left is None:
+        return node.right
+    elif node.right is None:
+        return node.left
+
+    node.update()
+    return node
@@ -11,33 +11,46 @@ and the LICENSE file for more information.
 Author: Andrew Qiu (GitHub @andrewcoool)
 """
 
+# Patch the standard library before anything else imports it
+# so that blocking socket calls yield to other connections
+from gevent import monkey
+monkey.patch_all()
+
 import logging
-import json
-import colorlog
+import secrets
+import orjson
 from flask import Flask, render_template, request
 from flask_socketio import SocketIO, emit
-from editor import Editor, get_random_string
-from transform import DeleteOperation, InsertOperation, Position
-
-# Add Color
-handler = colorlog.StreamHandler()
-handler.setFormatter(colorlog.ColoredFormatter(
-    '%(log_color)s%(levelname)-8s%(reset)s %(yellow)s%(message)s',
-))
+from editor import Editor
+from logging_config import get_logger
 
 # Restrict logging to this file
-logger = colorlog.getLogger('server')
-logger.addHandler(handler)
-logger.setLevel(logging.INFO)
+logger = get_logger('server')
+
+
+class OrjsonPackets:
+    """Adapter with the interface of the json module that Socket.IO
+    uses to encode and decode the packets wrapping every message.
+    """
+
+    @staticmethod
+    def dumps(obj: object, **kwargs) -> str:
+        """Return obj encoded as compact JSON"""
+        return orjson.dumps(obj).decode()
+
+    @staticmethod
+    def loads(data: str) -> object:
+        """Return the object encoded in data"""
+        return orjson.loads(data)
 
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'secret!'
-socket = SocketIO(app, async_mode=None)
+socket = SocketIO(app, async_mode='gevent', json=OrjsonPackets)
 
 # Mapping that maps editor ids to Editors
 editors = {}
-# Mapping that maps session ids to their editor_ids
+# Mapping that maps session ids to the Editors they have joined
 clients = {}
 
 
@@ -53,9 +66,12 @@ def access() -> str:
     elif editor_id in editors:
         editor = editors[editor_id]
 
-        return render_template('editor.html',
-                               document=editor.document.get_text(),
-                               sync_mode=socket.async_mode)
+        # Only re-render the page if the document has changed. The cached
+        # page is served as is, so TEMPLATES_AUTO_RELOAD only picks up an
+        # edited editor.html once the document next changes
+        return editor.get_page(lambda text: render_template('editor.html',
+                                                            document=text,
+                                                            sync_mode=socket.async_mode))
 
     else:
         return render_template('editor_home.html', is_error='true')
@@ -66,10 +82,12 @@ def create() -> str:
     """Called when a user asks to create a new editor.
     """
 
-    editor_id = get_random_string(5)
+    # 48 random bits make a repeat vanishingly rare, but a repeat
+    # would replace a live editor, so it is still checked for
+    editor_id = secrets.token_urlsafe(6)
 
     while editor_id in editors:
-        editor_id = get_random_string(5)
+        editor_id = secrets.token_urlsafe(6)
 
     editors[editor_id] = Editor()
 
@@ -96,39 +114,62 @@ def joined(editor_id) -> None:
     editor = editors[editor_id]
 
     # Attach session to this editor
-    clients[session_id] = editor_id
+    clients[session_id] = editor
 
     document = editor.document
     drawing = editor.drawing
 
-    document.clients[session_id] = document.get_last_revision_num()
+    document.submit_join(session_id)
     drawing.clients[session_id] = drawing.get_last_revision_num()
 
     logger.info(f'Client {session_id} has successfully joined editor {editor_id}.')
 
-    lines = json.dumps(list(drawing.get_changes_since_revision_num(-1)))
+    lines = drawing.get_changes_since_json(-1)
 
-    names_and_colors = json.dumps(list(editor.get_clients_state()))
+    names_and_colors = orjson.dumps(list(editor.get_clients_state())).decode()
 
     emit('after-join', (session_id, lines, names_and_colors))
 
 
+@socket.on('disconnect', namespace='/editor')
+def left() -> None:
+    """Receive when a user disconnects from the editor.
+
+    Stops tracking the revisions of the user so that they
+    no longer hold back the compaction of the document.
+    """
+
+    session_id = request.sid
+
+    editor = clients.pop(session_id, None)
+
+    if editor is None:
+        return
+
+    editor.document.submit_leave(session_id)
+    editor.drawing.clients.pop(session_id, None)
+
+    logger.info(f'Client {session_id} has left the editor.')
+
+
 @socket.on('submit-name', namespace='/editor')
 def submit_name(name):
     session_id = request.sid
 
-    if session_id not in clients:
+    editor = clients.get(session_id)
+
+    if editor is None:
         logger.error(f'Client {session_id} invoked submit name but has not properly accessed an editor!')
         return
 
-    editor_id = clients[session_id]
-    editor = editors[editor_id]
-
     if name == '':
-        name = 'Anon ' + get_random_string(5)
+        name = 'Anon ' + secrets.token_urlsafe(4)
 
     color = editor.add_client(session_id, name)
-    emit('new-user-joined', (session_id, name, color), broadcast=True)
+
+    # Broadcast in the background rather than holding up the handler
+    socket.start_background_task(socket.emit, 'new-user-joined', (session_id, name, color),
+                                 namespace='/editor')
 
 
 @socket.on('send-operation', namespace='/editor')
@@ -138,48 +179,46 @@ def update(raw_data) -> None:
 
     Processes new operations (raw_data) and sends back
     any transformed operations the user may be missing.
+
+    Updates are pulled by each client rather than pushed to every
+    client after a submit. The browser only transforms the operations
+    it receives against its unsent changes, not against changes it has
+    sent that the server has yet to process, so a pushed update would
+    be applied on the wrong base.
     """
 
     session_id = request.sid
 
-    if session_id not in clients:
+    editor = clients.get(session_id)
+
+    if editor is None:
         logger.error(f'Client {session_id} invoked update but has not properly accessed an editor!')
         return
 
-    editor_id = clients[session_id]
-    editor = editors[editor_id]
-
     document = editor.document
 
-    data = json.loads(raw_data)
-    changes = []
-
-    for change in data:
-        if change[0] == 'INS':
-            operation = InsertOperation(Position(change[1][0], change[1][1]), change[2], session_id)
-        elif change[0] == 'DEL':
-            operation = DeleteOperation(Position(change[1][0], change[1][1]), session_id)
-        else:
-            logger.error('A non INS or DEL was given!')
-            return
-
-        changes.append(operation)
+    changes = orjson.loads(raw_data)
 
     if len(changes) == 0 and document.is_on_latest_revision(author=session_id):
         # There are no changes to send
-        changes_for_client = []
+        emit('call-back', '[]', room=session_id)
+        return
 
     elif len(changes) == 0:
         # Implied the document needs to update
-        # Add empty changes and get back new changes
-        changes_for_client = document.add_changes(changes=changes, author=session_id)
-        logger.debug(f'User {session_id} updated their document to the latest version.')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'User {session_id} requested the latest version of their document.')
     else:
-        # Add changes and get back any changes the client needs to append
-        changes_for_client = document.add_changes(changes=changes, author=session_id)
-        logger.debug(f'User {session_id} submitted new changes.')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'User {session_id} submitted new changes.')
 
-    emit('call-back', json.dumps(changes_for_client), room=session_id)
+    def reply(changes_for_client: str) -> None:
+        """Send back the changes the client needs to append"""
+        socket.emit('call-back', changes_for_client, room=session_id, namespace='/editor')
+
+    # The document's writer thread parses and adds the changes (or empty
+    # changes to update) and replies once it reaches them
+    document.submit_changes(changes=changes, author=session_id, callback=reply)
 
 
 @socket.on('send-drawing', namespace='/editor')
@@ -194,23 +233,26 @@ def update_drawings(raw_data) -> None:
 
     session_id = request.sid
 
-    if session_id not in clients:
+    editor = clients.get(session_id)
+
+    if editor is None:
         logger.error(
             f'Client {session_id} invoked update_drawings but has not properly accessed an editor!')
         return
 
-    editor_id = clients[session_id]
-    editor = editors[editor_id]
-
     drawing = editor.drawing
 
-    data = json.loads(raw_data)
+    data = orjson.loads(raw_data)
 
-    changes_for_client = drawing.add_changes(changes=data, author=session_id)
+    changes_for_client = drawing.add_changes_json(changes=data, author=session_id)
 
-    emit('draw-call-back', json.dumps(changes_for_client), room=session_id)
+    # Send in the background so the handler can return to receiving
+    socket.start_background_task(socket.emit, 'draw-call-back', changes_for_client,
+                                 room=session_id, namespace='/editor')
 
 
 if __name__ == '__main__':
+    # Pages of unchanged documents are cached by their Editor
+    # and do not reload until the document changes
     app.config['TEMPLATES_AUTO_RELOAD'] = True
     socket.run(app, debug=False, host='192.168.1.72', port=8080)
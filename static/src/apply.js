@@ -19,15 +19,15 @@ Author: Andrew Qiu (GitHub @andrewcoool)
  * @param {Editor} editor_ - the ace editor to apply the operation on
  */
 function apply(op, editor_){
-    if (op[0] == 'ID'){return;}
+    if (op[0] == ID){return;}
 
     // Default row 0 for now
-    const pos = {'row': op[1][0], 'column': op[1][1]};
+    const pos = {'row': op[1], 'column': op[2]};
 
-    if (op[0] == 'INS'){
+    if (op[0] == INS){
 
-        editor_.session.insert(pos, op[2]);
-    }else if (op[0] == 'DEL'){
+        editor_.session.insert(pos, op[3]);
+    }else if (op[0] == DEL){
         // const range = new ace.require('ace/range').Range(0, op[1], 0, op[1] + 1);
         // console.log(range);
 
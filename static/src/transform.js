@@ -14,25 +14,32 @@ and the LICENSE file for more information.
 Author: Andrew Qiu (GitHub @andrewcoool)
 */
 
+// The kinds of operations, as sent by the server
+// in the first element of each operation
+const INS = 0;
+const DEL = 1;
+const ID = 2;
+
+
 /**
- * Return whether or not pos_1 is before pos_2
- * @param {Array} pos_1 - The first position
- * @param {Array} pos_2 - The second position
- * @returns {boolean} Whether or not pos_1 is before pos_2
+ * Return whether or not op_1 is positioned before op_2
+ * @param {Array} op_1 - The first operation
+ * @param {Array} op_2 - The second operation
+ * @returns {boolean} Whether or not op_1 is before op_2
  */
-function is_pos_before(pos_1, pos_2){
-    return pos_1[0] < pos_2[0] || (pos_1[0] == pos_2[0] && pos_1[1] < pos_2[1]);
+function is_op_before(op_1, op_2){
+    return op_1[1] < op_2[1] || (op_1[1] == op_2[1] && op_1[2] < op_2[2]);
 }
 
 
 /**
- * Return whether or not pos_1 is the same as pos_2
- * @param {Array} pos_1 - The first position
- * @param {Array} pos_2 - The second position
- * @returns {boolean} Whether or not pos_1 is the same as pos_2
+ * Return whether or not op_1 is positioned the same as op_2
+ * @param {Array} op_1 - The first operation
+ * @param {Array} op_2 - The second operation
+ * @returns {boolean} Whether or not op_1 is at the same position as op_2
  */
-function is_same_pos(pos_1, pos_2){
-    return pos_1[0] == pos_2[0] && pos_1[1] == pos_2[1];
+function is_op_same_pos(op_1, op_2){
+    return op_1[1] == op_2[1] && op_1[2] == op_2[2];
 }
 
 /**
@@ -47,15 +54,15 @@ function xform(op_1, op_2){
     const t_1 = op_1[0];
     const t_2 = op_2[0];
 
-    if (t_1 == 'ID' || t_2 == 'ID'){return op_1;}
+    if (t_1 == ID || t_2 == ID){return op_1;}
 
-    if (t_1 == 'INS' && t_2 == 'INS'){
+    if (t_1 == INS && t_2 == INS){
         return t_ii(op_1, op_2);
-    }else if (t_1 == 'INS' && t_2 == 'DEL'){
+    }else if (t_1 == INS && t_2 == DEL){
         return t_id(op_1, op_2);
-    }else if (t_1 == 'DEL' && t_2 == 'INS'){
+    }else if (t_1 == DEL && t_2 == INS){
         return t_di(op_1, op_2);
-    }else if(t_1 == 'DEL' && t_2 == 'DEL'){
+    }else if(t_1 == DEL && t_2 == DEL){
         return t_dd(op_1, op_2);
     }
 }
@@ -101,71 +108,59 @@ function xform_multiple(op_lefts, op_rights){
 }
 
 function t_ii(op_1, op_2){
-    let pos_1 = op_1[1];
-    let pos_2 = op_2[1];
-
-    if (is_pos_before(pos_1, pos_1) || (is_same_pos(pos_1, pos_2) && op_1[3] < op_2[3])){
-        return ['INS', pos_1, op_1[2], op_1[3]];
+    if (is_op_before(op_1, op_2) || (is_op_same_pos(op_1, op_2) && op_1[4] < op_2[4])){
+        return op_1;
     }else{
-        if(op_2[2] == '\n'){
-            return ['INS', [pos_1[0] + 1, pos_1[1]], op_1[2], op_1[3]];
-        }else if (pos_1[0] == pos_2[0]){
-            return ['INS', [pos_1[0], pos_1[1] + 1], op_1[2], op_1[3]];
+        if(op_2[3] == '\n'){
+            return [INS, op_1[1] + 1, op_1[2], op_1[3], op_1[4]];
+        }else if (op_1[1] == op_2[1]){
+            return [INS, op_1[1], op_1[2] + 1, op_1[3], op_1[4]];
         }else{
-            return ['INS', pos_1, op_1[2], op_1[3]];
+            return op_1;
         }
     }
 }
 
 function t_id(op_1, op_2){
-    let pos_1 = op_1[1];
-    let pos_2 = op_2[1];
-
-    if(is_pos_before(pos_1, pos_2) || is_same_pos(pos_1, pos_2)){
-        return ['INS', pos_1, op_1[2], op_1[3]];
+    if(is_op_before(op_1, op_2) || is_op_same_pos(op_1, op_2)){
+        return op_1;
     }else{
-        if(pos_2[1] == -1){
-            return ['INS', [pos_1[0] - 1, pos_1[1]], op_1[2], op_1[3]];
-        }else if(pos_1[0] == pos_2[0]){
-            return ['INS', [pos_1[0], pos_1[1] - 1], op_1[2], op_1[3]];
+        if(op_2[2] == -1){
+            return [INS, op_1[1] - 1, op_1[2], op_1[3], op_1[4]];
+        }else if(op_1[1] == op_2[1]){
+            return [INS, op_1[1], op_1[2] - 1, op_1[3], op_1[4]];
         }else{
-            return ['INS', pos_1, op_1[2], op_1[3]];
+            return op_1;
         }
     }
 }
 
 function t_di(op_1, op_2){
-    let pos_1 = op_1[1];
-    let pos_2 = op_2[1];
-
-    if(is_pos_before(pos_1, pos_2)){
-        return ['DEL', pos_1, op_1[2]];
+    if(is_op_before(op_1, op_2)){
+        return op_1;
     }else{
-        if(op_2[2] == '\n'){
-            return ['DEL', [pos_1[0] + 1, pos_1[1]], op_1[2]];
-        }else if(pos_1[0] == pos_2[0]){
-            return ['DEL', [pos_1[0], pos_1[1] + 1], op_1[2]];
+        if(op_2[3] == '\n'){
+            return [DEL, op_1[1] + 1, op_1[2], '', op_1[4]];
+        }else if(op_1[1] == op_2[1]){
+            return [DEL, op_1[1], op_1[2] + 1, '', op_1[4]];
         }else{
-            return ['DEL', pos_1, op_1[2]];
+            return op_1;
         }
     }
 }
 
-function t_dd(){
-    let pos_1 = op_1[1];
-    let pos_2 = op_2[1];
-
-    if (is_pos_before(pos_1, pos_2)){
-        return ['DEL', pos_1, op_1[2]];
-    }else if(!is_same_pos(pos_1, pos_2)){
-        if (pos_2[1] == -1){
-            return ['DEL', [pos_1[0] - 1, pos_1[1]], op_1[2]];
-        }else if(pos_1[0] == pos_2[0]){
-            return ['DEL', [pos_1[0], pos_1[1]] - 1, op_1[2]];
+function t_dd(op_1, op_2){
+    if (is_op_before(op_1, op_2)){
+        return op_1;
+    }else if(!is_op_same_pos(op_1, op_2)){
+        if (op_2[2] == -1){
+            return [DEL, op_1[1] - 1, op_1[2], '', op_1[4]];
+        }else if(op_1[1] == op_2[1]){
+            return [DEL, op_1[1], op_1[2] - 1, '', op_1[4]];
         }else{
-            return ['DEL', pos_1, op_1[2]];
+            return op_1;
         }
     }else{
-        return ['ID', op_1[2]];
+        return [ID, 0, 0, '', op_1[4]];
     }
 }
\ No newline at end of file
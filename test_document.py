@@ -0,0 +1,197 @@
+"""Tests for the document module.
+
+Copyright and Usage Information
+===============================
+
+This project and file is licensed with the MIT License.
+See https://github.com/andrewcoool/collaborate-code/
+and the LICENSE file for more information.
+
+Author: Andrew Qiu (GitHub @andrewcoool)
+"""
+
+import threading
+import pytest
+import document
+from document import Document
+from transform import InsertOperation, Position
+
+
+@pytest.fixture(autouse=True)
+def small_threshold(monkeypatch) -> None:
+    """Compact after a handful of revisions rather than hundreds."""
+    monkeypatch.setattr(document, 'COMPACTION_THRESHOLD', 4)
+
+
+@pytest.fixture
+def doc() -> Document:
+    """Return a new document, whose writer thread is stopped after the test."""
+    new_document = Document()
+    yield new_document
+    new_document.close()
+
+
+def _type(doc: Document, author: str, characters: str) -> None:
+    """Add one revision per character, each appending it to the text"""
+    for character in characters:
+        column = len(doc.get_text())
+        doc.add_changes([InsertOperation(Position(0, column), character, author)], author)
+
+
+def test_revision_nums_stay_absolute_after_compaction(doc: Document) -> None:
+    """Compaction drops old revisions without renumbering the rest."""
+    doc.clients['a'] = doc.get_last_revision_num()
+
+    _type(doc, 'a', 'abcdefghijklmnopqrst')
+
+    assert doc.get_last_revision_num() == 19
+    assert doc.clients['a'] == 19
+    assert doc.get_text() == 'abcdefghijklmnopqrst'
+
+    revision = doc.get_revision(19)
+    assert revision.revision_num == 19
+    assert [change.character for change in revision.changes] == ['t']
+
+
+def test_compacted_revisions_raise(doc: Document) -> None:
+    """Asking for changes since a compacted revision raises ValueError."""
+    doc.clients['a'] = doc.get_last_revision_num()
+
+    _type(doc, 'a', 'abcdefghijklmnopqrst')
+
+    with pytest.raises(ValueError):
+        doc.get_changes_since_revision_num(0)
+    with pytest.raises(ValueError):
+        doc.get_revision(0)
+
+
+def test_changes_since_latest_revision_is_empty(doc: Document) -> None:
+    """There are no changes since the latest revision, even after compaction."""
+    doc.clients['a'] = doc.get_last_revision_num()
+
+    _type(doc, 'a', 'abcdefghijklmnopqrst')
+
+    assert doc.get_changes_since_revision_num(doc.get_last_revision_num()) == []
+    assert doc.get_changes_since_json(doc.get_last_revision_num()) == '[]'
+
+
+def test_lagging_client_holds_back_compaction(doc: Document) -> None:
+    """Revisions a client has yet to see are kept, and are sent
+    to it by their absolute revision_nums once it updates."""
+    doc.clients['a'] = doc.get_last_revision_num()
+
+    _type(doc, 'a', 'abcdefghij')
+
+    # b joins at revision 9 and then falls behind
+    doc.clients['b'] = doc.get_last_revision_num()
+    _type(doc, 'a', 'klmnopqrst')
+
+    changes = doc.get_changes_since_revision_num(9)
+    assert [change.character for change in changes] == list('klmnopqrst')
+
+    with pytest.raises(ValueError):
+        doc.get_changes_since_revision_num(0)
+
+    # Updating moves b to the latest revision
+    assert len(doc.add_changes([], 'b')) == 10
+    assert doc.clients['b'] == 19
+
+
+def test_joins_and_leaves_run_in_order_on_the_writer(doc: Document) -> None:
+    """Joins and leaves are queued behind earlier submissions."""
+    doc.submit_join('a')
+    doc.submit_join('b')
+
+    replies = []
+    done = threading.Event()
+
+    doc.submit_changes([[0, 0, 0, 'x', 'a']], 'a', replies.append)
+    doc.submit_leave('a')
+    doc.submit_changes([], 'b', lambda payload: (replies.append(payload), done.set()))
+
+    assert done.wait(5)
+    assert replies == ['[]', '[[0,0,0,"x","a"]]']
+    assert doc.clients == {'b': 0}
+    assert doc.get_text() == 'x'
+
+
+def test_queued_join_holds_back_compaction(doc: Document) -> None:
+    """Submissions queued ahead of a join cannot compact away
+    the revision the joining client is on."""
+    doc.submit_join('b')
+
+    # Hold the writer until everything below is queued
+    gate = threading.Event()
+    doc.submit_changes([], 'b', lambda payload: gate.wait(5))
+
+    for column in range(10):
+        doc.submit_changes([[0, 0, column, 'x', 'b']], 'b', lambda payload: None)
+
+    doc.submit_join('a')
+    gate.set()
+
+    replies = []
+    done = threading.Event()
+    doc.submit_changes([], 'a', lambda payload: (replies.append(payload), done.set()))
+
+    assert done.wait(5)
+    assert replies == ['[' + ','.join(f'[0,0,{column},"x","b"]' for column in range(10)) + ']']
+    assert doc.clients == {'a': 9, 'b': 9}
+
+
+def test_failed_batch_leaves_document_unchanged(doc: Document) -> None:
+    """A batch with an operation outside the text is not applied at all."""
+    doc.clients['a'] = doc.get_last_revision_num()
+
+    with pytest.raises(IndexError):
+        doc.add_changes_raw([[0, 0, 0, 'x'], [0, 0, 1, 'y'], [0, 0, 9, 'z']], 'a')
+
+    assert doc.get_text() == ''
+    assert doc.get_last_revision_num() == -1
+    assert doc.clients['a'] == -1
+
+
+def test_failed_batch_undoes_deletes(doc: Document) -> None:
+    """Deletes, including joined rows, are undone when a later
+    operation in their batch fails."""
+    doc.clients['a'] = doc.get_last_revision_num()
+    doc.add_changes_raw([[0, 0, 0, 'a'], [0, 0, 1, 'b'], [0, 0, 2, '\n'],
+                         [0, 1, 0, 'c'], [0, 1, 1, 'd']], 'a')
+
+    with pytest.raises(IndexError):
+        doc.add_changes_raw([[1, 1, -1, ''], [1, 0, 0, ''], [0, 0, 1, 'x'], [1, 5, 0, '']], 'a')
+
+    assert doc.get_text() == 'ab\ncd'
+    assert doc.get_last_revision_num() == 0
+
+
+def test_writer_continues_after_a_failed_submission(doc: Document, monkeypatch) -> None:
+    """A submission that raises is logged, and later submissions
+    are still added and replied to."""
+    logged = []
+    monkeypatch.setattr(document.logger, 'exception', logged.append)
+
+    doc.submit_join('a')
+
+    replies = []
+    done = threading.Event()
+
+    doc.submit_changes([[7, 0, 0, 'x', 'a']], 'a', replies.append)
+    doc.submit_changes([[0, 0, 1, 'y', 'a']], 'a', replies.append)
+    doc.submit_changes([[0, 0, 0, 'x', 'a']], 'a', lambda payload: (replies.append(payload), done.set()))
+
+    assert done.wait(5)
+    assert replies == ['[]']
+    assert len(logged) == 2
+    assert doc.get_text() == 'x'
+    assert doc.clients['a'] == 0
+
+
+def test_close_stops_the_writer() -> None:
+    """Closing a document runs its queued tasks and stops its writer thread."""
+    doc = Document()
+    doc.submit_join('a')
+    doc.close()
+
+    assert doc.clients == {'a': -1}
+    assert not doc._writer.is_alive()
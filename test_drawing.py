@@ -0,0 +1,45 @@
+"""Tests for the drawing module.
+
+Copyright and Usage Information
+===============================
+
+This project and file is licensed with the MIT License.
+See https://github.com/andrewcoool/collaborate-code/
+and the LICENSE file for more information.
+
+Author: Andrew Qiu (GitHub @andrewcoool)
+"""
+
+from drawing import Drawing
+
+
+def test_polls_add_no_revisions() -> None:
+    """Polling with no new lines leaves the revisions unchanged."""
+    drawing = Drawing()
+    drawing.clients['a'] = drawing.get_last_revision_num()
+    drawing.add_changes_json([[1, 2, 3]], 'a')
+
+    drawing.clients['b'] = -1
+    assert drawing.add_changes_json([], 'b') == '[[1,2,3]]'
+    assert drawing.add_changes_json([], 'a') == '[]'
+
+    assert drawing.get_last_revision_num() == 0
+    assert drawing.clients == {'a': 0, 'b': 0}
+
+
+def test_clients_on_the_same_revision_share_a_payload() -> None:
+    """Clients polling from the same revision get the same cached payload."""
+    drawing = Drawing()
+    drawing.clients['a'] = drawing.get_last_revision_num()
+    drawing.clients['b'] = drawing.get_last_revision_num()
+    drawing.clients['c'] = drawing.get_last_revision_num()
+    drawing.add_changes_json([[1, 2, 3]], 'c')
+
+    payload_a = drawing.add_changes_json([], 'a')
+    payload_b = drawing.add_changes_json([], 'b')
+
+    assert payload_a == '[[1,2,3]]'
+    assert payload_b is payload_a
+
+    # A join after the polls is still served from the cache
+    assert drawing.get_changes_since_json(-1) is payload_a
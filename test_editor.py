@@ -0,0 +1,37 @@
+"""Tests for the editor module.
+
+Copyright and Usage Information
+===============================
+
+This project and file is licensed with the MIT License.
+See https://github.com/andrewcoool/collaborate-code/
+and the LICENSE file for more information.
+
+Author: Andrew Qiu (GitHub @andrewcoool)
+"""
+
+from editor import Editor
+from transform import InsertOperation, Position
+
+
+def test_page_is_rendered_once_per_revision() -> None:
+    """The page is only rendered again once the document changes."""
+    editor = Editor()
+    rendered = []
+
+    def render(text: str) -> str:
+        rendered.append(text)
+        return f'<page {text}>'
+
+    assert editor.get_page(render) == '<page >'
+    assert editor.get_page(render) == '<page >'
+    assert rendered == ['']
+
+    editor.document.clients['a'] = editor.document.get_last_revision_num()
+    editor.document.add_changes([InsertOperation(Position(0, 0), 'x', 'a')], 'a')
+
+    assert editor.get_page(render) == '<page x>'
+    assert editor.get_page(render) == '<page x>'
+    assert rendered == ['', 'x']
+
+    editor.document.close()
@@ -0,0 +1,154 @@
+"""Tests for the rope module and the Text class built on it.
+
+Copyright and Usage Information
+===============================
+
+This project and file is licensed with the MIT License.
+See https://github.com/andrewcoool/collaborate-code/
+and the LICENSE file for more information.
+
+Author: Andrew Qiu (GitHub @andrewcoool)
+"""
+
+import random
+import pytest
+import rope
+from rope import Rope
+from document import Text
+from transform import DeleteOperation, InsertOperation, Position
+
+
+@pytest.fixture(autouse=True)
+def small_leaves(monkeypatch) -> None:
+    """Use tiny leaves so that splits, rebuilds and collapses happen
+    within a few hundred characters."""
+    monkeypatch.setattr(rope, 'LEAF_SIZE', 4)
+
+
+def _line_starts(text: str) -> list:
+    """Return the offset of the first character of each row of text"""
+    return [0] + [i + 1 for i, character in enumerate(text) if character == '\n']
+
+
+def test_rope_matches_string() -> None:
+    """Random inserts and deletes on a rope give the same text
+    and row offsets as the same edits on a string."""
+    random.seed(0)
+    model = ''
+    tree = Rope()
+
+    for step in range(5000):
+        # Grow for the first half, then mostly shrink back down
+        if model == '' or random.random() < (0.7 if step < 2500 else 0.3):
+            offset = random.randint(0, len(model))
+            chunk = ''.join(random.choice('ab\n') for _ in range(random.randint(1, 12)))
+            model = model[:offset] + chunk + model[offset:]
+            tree.insert(offset, chunk)
+        else:
+            offset = random.randrange(len(model))
+            length = random.randint(1, min(20, len(model) - offset))
+            model = model[:offset] + model[offset + length:]
+            tree.delete(offset, length)
+
+        assert len(tree) == len(model)
+        assert tree.count_newlines() == model.count('\n')
+
+        if step % 50 == 0:
+            assert tree.get_text() == model
+            assert ''.join(tree.get_char(offset) for offset in range(len(tree))) == model
+            assert [tree.get_line_start(row) for row in range(tree.count_newlines() + 1)] \
+                == _line_starts(model)
+
+    assert tree.get_text() == model
+
+
+def test_rope_delete_everything() -> None:
+    """Deleting the whole text leaves an empty rope that can grow again."""
+    tree = Rope('abc\n' * 50)
+    tree.delete(0, len(tree))
+
+    assert tree.get_text() == ''
+    assert len(tree) == 0
+
+    tree.insert(0, 'x\ny')
+    assert tree.get_text() == 'x\ny'
+    assert tree.get_line_start(1) == 2
+
+
+def test_rope_rejects_out_of_range() -> None:
+    """Offsets and rows outside the rope raise IndexError."""
+    tree = Rope('ab\nc')
+
+    with pytest.raises(IndexError):
+        tree.insert(5, 'x')
+    with pytest.raises(IndexError):
+        tree.insert(-1, 'x')
+    with pytest.raises(IndexError):
+        tree.delete(-1, 1)
+    with pytest.raises(IndexError):
+        tree.delete(3, 2)
+    with pytest.raises(IndexError):
+        tree.get_line_start(2)
+    with pytest.raises(IndexError):
+        tree.get_char(4)
+
+    assert tree.get_text() == 'ab\nc'
+
+
+def test_text_matches_rows() -> None:
+    """Random valid operations on a Text give the same text
+    as the same operations on a list of rows."""
+    random.seed(1)
+    rows = [[]]
+    text = Text()
+
+    for step in range(5000):
+        row = random.randrange(len(rows))
+
+        if random.random() < 0.6:
+            column = random.randint(0, len(rows[row]))
+            character = random.choice('ab\n')
+            operation = InsertOperation(Position(row, column), character, 'a')
+
+            if character == '\n':
+                rows.insert(row + 1, rows[row][column:])
+                rows[row] = rows[row][:column]
+            else:
+                rows[row].insert(column, character)
+        elif rows[row] and random.random() < 0.8:
+            column = random.randrange(len(rows[row]))
+            operation = DeleteOperation(Position(row, column), 'a')
+            rows[row].pop(column)
+        elif row > 0:
+            operation = DeleteOperation(Position(row, -1), 'a')
+            rows[row - 1].extend(rows.pop(row))
+        else:
+            continue
+
+        text.apply(operation)
+
+        if step % 50 == 0:
+            assert text.get_text() == '\n'.join(''.join(line) for line in rows)
+
+    assert text.get_text() == '\n'.join(''.join(line) for line in rows)
+
+
+def test_text_rejects_positions_outside_rows() -> None:
+    """Operations outside the bounds of their row raise IndexError
+    and leave the text unchanged."""
+    text = Text()
+
+    for operation in [InsertOperation(Position(0, 0), 'a', 'a'),
+                      InsertOperation(Position(0, 1), '\n', 'a'),
+                      InsertOperation(Position(1, 0), 'b', 'a')]:
+        text.apply(operation)
+
+    for operation in [DeleteOperation(Position(0, -1), 'a'),
+                      DeleteOperation(Position(0, 1), 'a'),
+                      DeleteOperation(Position(2, 0), 'a'),
+                      InsertOperation(Position(0, 2), 'c', 'a'),
+                      InsertOperation(Position(-1, 0), 'c', 'a')]:
+        with pytest.raises(IndexError):
+            text.apply(operation)
+
+    assert text.get_text() == 'a\nb'
@@ -0,0 +1,111 @@
+"""Tests for the transform module.
+
+Copyright and Usage Information
+===============================
+
+This project and file is licensed with the MIT License.
+See https://github.com/andrewcoool/collaborate-code/
+and the LICENSE file for more information.
+
+Author: Andrew Qiu (GitHub @andrewcoool)
+"""
+
+import random
+from typing import List
+import pytest
+from document import Text
+from transform import DEL, ID, INS, DeleteOperation, IdentityOperation, InsertOperation, \
+    Operation, Position, t_di, t_ii, xform
+
+
+def _make_text(rows: List[str]) -> Text:
+    """Return a Text holding the given rows"""
+    text = Text()
+
+    for row, line in enumerate(rows):
+        if row > 0:
+            text.apply(InsertOperation(Position(row - 1, len(rows[row - 1])), '\n', 'setup'))
+        for column, character in enumerate(line):
+            text.apply(InsertOperation(Position(row, column), character, 'setup'))
+
+    return text
+
+
+def _random_operation(rows: List[str], row: int, author: str) -> Operation:
+    """Return a random valid operation on the given row"""
+    roll = random.random()
+
+    if roll < 0.5:
+        return InsertOperation(Position(row, random.randint(0, len(rows[row]))),
+                               random.choice('a\n'), author)
+    elif roll < 0.7 and row > 0:
+        return DeleteOperation(Position(row, -1), author)
+    elif rows[row]:
+        return DeleteOperation(Position(row, random.randrange(len(rows[row]))), author)
+    else:
+        return InsertOperation(Position(row, 0), 'a', author)
+
+
+def test_from_lists_parses_inserts_and_deletes() -> None:
+    """Lists sent by a client become operations by the given author."""
+    operations = Operation.from_lists([[INS, 1, 2, 'a', 'ignored'],
+                                       [DEL, 3, -1, '', 'ignored']], 'author')
+
+    assert operations == [InsertOperation(Position(1, 2), 'a', 'author'),
+                          DeleteOperation(Position(3, -1), 'author')]
+
+
+def test_from_lists_rejects_unknown_kinds() -> None:
+    """Only inserts and deletes may be sent by a client."""
+    with pytest.raises(ValueError):
+        Operation.from_lists([[INS, 0, 0, 'a', 'a'], [ID, 0, 0, '', 'a']], 'a')
+    with pytest.raises(ValueError):
+        Operation.from_lists([['INS', 0, 0, 'a', 'a']], 'a')
+
+
+def test_list_structures() -> None:
+    """Every operation is sent as [kind, row, column, character, author]."""
+    assert InsertOperation(Position(1, 2), 'a', 'x').get_list_structure() \
+        == [0, 1, 2, 'a', 'x']
+    assert DeleteOperation(Position(3, -1), 'x').get_list_structure() \
+        == [1, 3, -1, '', 'x']
+    assert IdentityOperation('x').get_list_structure() == [2, 0, 0, '', 'x']
+
+
+def test_t_ii_newline_on_earlier_row() -> None:
+    """A newline inserted on an earlier row pushes an insert down a row."""
+    op_1 = InsertOperation(Position(2, 0), 'a', 'a')
+    op_2 = InsertOperation(Position(1, 5), '\n', 'b')
+
+    assert t_ii(op_1, op_2) == InsertOperation(Position(3, 0), 'a', 'a')
+
+
+def test_t_di_newline_on_earlier_row() -> None:
+    """A newline inserted on an earlier row pushes a delete down a row."""
+    op_1 = DeleteOperation(Position(2, 0), 'a')
+    op_2 = InsertOperation(Position(1, 5), '\n', 'b')
+
+    assert t_di(op_1, op_2) == DeleteOperation(Position(3, 0), 'a')
+
+
+def test_concurrent_operations_on_different_rows_converge() -> None:
+    """Applying two concurrent operations on different rows in either
+    order, each transformed against the other, gives the same text."""
+    random.seed(0)
+
+    for _ in range(2000):
+        rows = [''.join(random.choice('xy') for _ in range(random.randint(0, 4)))
+                for _ in range(random.randint(2, 5))]
+        row_a, row_b = random.sample(range(len(rows)), 2)
+        op_a = _random_operation(rows, row_a, 'a')
+        op_b = _random_operation(rows, row_b, 'b')
+
+        text_a = _make_text(rows)
+        text_a.apply(op_a)
+        text_a.apply(xform(op_b, op_a))
+
+        text_b = _make_text(rows)
+        text_b.apply(op_b)
+        text_b.apply(xform(op_a, op_b))
+
+        assert text_a.get_text() == text_b.get_text(), (rows, op_a, op_b)
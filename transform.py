@@ -4,6 +4,23 @@ and their transformations against each other.
 
 This module applies Operation Transformation algorithms.
 
+Control Algorithm
+=================
+
+The server follows the Jupiter model: every client is bridged
+only to the server, never to other clients. The document remembers
+the last revision each client has acknowledged, and the changes
+made since then form that client's bridge. When a client submits
+a batch, xform_multiple transforms the batch against its bridge:
+
+    - each submitted operation is transformed once against each
+      operation in the bridge, so the work per operation grows
+      linearly with how far behind the client is
+    - the transformed batch becomes a new server revision
+    - the transformed bridge is sent back for the client to apply
+
+The client then acknowledges the new revision and its bridge is empty.
+
 Copyright and Usage Information
 ===============================
 
@@ -14,10 +31,37 @@ and the LICENSE file for more information.
 Author: Andrew Qiu (GitHub @andrewcoool)
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
 from typing import List, Union, Tuple
 
+# The kinds of operations, used in place of their identity
+# strings wherever operations are dispatched or sent as JSON
+INS = 0
+DEL = 1
+ID = 2
+
+
+def _add_slots(cls: type) -> type:
+    """Return a copy of the dataclass cls that stores its
+    fields in __slots__ instead of an instance __dict__.
+
+    This is what dataclass(slots=True) does on Python 3.10+.
+    """
+
+    names = tuple(f.name for f in fields(cls))
 
+    namespace = dict(cls.__dict__)
+    namespace['__slots__'] = names
+    namespace.pop('__dict__', None)
+    namespace.pop('__weakref__', None)
+
+    for name in names:
+        namespace.pop(name, None)
+
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@_add_slots
 @dataclass
 class Position:
     """Class representing a position
@@ -50,7 +94,16 @@ class Operation:
     """(Abstract) Class that represents an
     operation executed on a document that may or may
     not change the document's state.
+
+    Class Attributes:
+        - kind: the kind of the operation (INS, DEL, or ID)
+        - identity: the identity of the operation ('INS', 'DEL', or 'ID')
     """
+
+    __slots__ = ()
+
+    kind: int
+    identity: str
     author: str
 
     def get_list_structure(self) -> list:
@@ -64,35 +117,75 @@ class Operation:
         of the operation.
         """
 
-        raise NotImplementedError
+        return self.identity
 
+    @staticmethod
+    def from_lists(changes: List[list], author: str) -> List['Operation']:
+        """Return the operations represented by a batch of lists
+        received as JSON from a client.
 
+        The whole batch is parsed in one call with the constructors
+        bound locally, as clients send many operations at once.
+
+        List Structure:
+            - 0: INS or DEL (kind)
+            - 1: row
+            - 2: column
+            - 3: character ('' for DEL)
+
+        Raise ValueError if a kind is not INS or DEL.
+        """
+
+        insert, delete, position = InsertOperation, DeleteOperation, Position
+        operations = []
+        append = operations.append
+
+        for change in changes:
+            kind = change[0]
+
+            if kind == INS:
+                append(insert(position(change[1], change[2]), change[3], author))
+            elif kind == DEL:
+                append(delete(position(change[1], change[2]), author))
+            else:
+                raise ValueError(f'Unknown operation kind {kind!r}')
+
+        return operations
+
+
+@_add_slots
 @dataclass
 class InsertOperation(Operation):
     """A class representing an operation that inserts
     a character a specified position."""
 
+    kind = INS
+    identity = 'INS'
+
     position: Position
     character: str
     author: str
 
+    # Private Instance Attributes:
+    #   - _wire: the list structure of the operation, built once
+    #            since operations are never modified
+    _wire: list = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._wire = [INS, self.position.row, self.position.column, self.character, self.author]
+
     def get_list_structure(self) -> list:
         """Return the position as a list
         as to be sent as JSON
 
         List Structure:
-            - 0 : 'INS' (identity)
-            - 1: [row, column] (position)
-            - 2: character
-            - 3: author
+            - 0: INS (kind)
+            - 1: row
+            - 2: column
+            - 3: character
+            - 4: author
         """
-        return ['INS', self.position.to_list_structure(), self.character, self.author]
-
-    def get_identity(self) -> str:
-        """Return the identity
-        of the operation ('INS')"""
-
-        return 'INS'
+        return self._wire
 
     def __str__(self) -> str:
         if self.character == '\n':
@@ -102,47 +195,56 @@ class InsertOperation(Operation):
         return f'INS "{char}" @ {self.position}'
 
 
+@_add_slots
 @dataclass
 class DeleteOperation(Operation):
     """A class representing an operation that deletes
     a character at a specified position."""
 
+    kind = DEL
+    identity = 'DEL'
+
     position: Position
     author: str
 
+    # Private Instance Attributes:
+    #   - _wire: the list structure of the operation, built once
+    #            since operations are never modified
+    _wire: list = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._wire = [DEL, self.position.row, self.position.column, '', self.author]
+
     def get_list_structure(self) -> list:
         """Return the position as a list
         as to be sent as JSON
 
         List Structure:
-            - 0 : 'DEL' (identity)
-            - 1: [row, column] (position)
-            - 2: author
-        """
-        return ['DEL', self.position.to_list_structure(), self.author]
-
-    def get_identity(self) -> str:
-        """Return the identity of
-        the operation ('DEL')
+            - 0: DEL (kind)
+            - 1: row
+            - 2: column
+            - 3: '' (no character)
+            - 4: author
         """
-        return 'DEL'
+        return self._wire
 
     def __str__(self) -> str:
         return f'DEL @ {self.position}'
 
 
+@_add_slots
 @dataclass
 class IdentityOperation(Operation):
     """A class representing an operation that does nothing
     and preserves the original document state."""
 
+    kind = ID
+    identity = 'ID'
+
     author: str
 
     def get_list_structure(self) -> list:
-        return ['ID', self.author]
-
-    def get_identity(self) -> str:
-        return 'ID'
+        return [ID, 0, 0, '', self.author]
 
     def __str__(self) -> str:
         return 'IDENTITY OPERATOR'
@@ -163,25 +265,18 @@ def xform_multiple(op_lefts: List[Operation], op_rights: List[Operation]) \
         to reach the same state space
     """
 
-    # The operations the left and right side
-    # must apply to reach the same state space
-    to_apply_left = []
+    # The operations the right side must apply
+    # to reach the same state space
     to_apply_right = []
 
     current_rights = op_rights
 
-    for i in range(len(op_lefts)):
+    # current_left starts as the current leftmost operation
+    # and is transformed against each right operation in turn
+    for current_left in op_lefts:
         next_rights = []
 
-        # The current leftmost operation
-        opl = op_lefts[i]
-
-        # The current left operation to be transformed
-        current_left = opl
-
-        for j in range(len(current_rights)):
-            current_right = current_rights[j]
-
+        for current_right in current_rights:
             # Generate the next_rights
             next_rights.append(xform(current_right, current_left))
             current_left = xform(current_left, current_right)
@@ -189,9 +284,9 @@ def xform_multiple(op_lefts: List[Operation], op_rights: List[Operation]) \
         to_apply_right.append(current_left)
         current_rights = next_rights
 
-    to_apply_left = current_rights
-
-    return to_apply_left, to_apply_right
+    # Once transformed against every left operation, the
+    # rights are the operations the left side must apply
+    return current_rights, to_apply_right
 
 
 def xform(op_1: Operation, op_2: Operation) -> Operation:
@@ -201,37 +296,7 @@ def xform(op_1: Operation, op_2: Operation) -> Operation:
     Return the transformed op_1.
     """
 
-    id_1 = op_1.get_identity()
-    id_2 = op_2.get_identity()
-
-    # Handle special cases
-    if id_1 == 'ID' or id_2 == 'ID':
-        return op_1
-
-    options = {
-        ('INS', 'INS'): t_ii,
-        ('INS', 'DEL'): t_id,
-        ('DEL', 'INS'): t_di,
-        ('DEL', 'DEL'): t_dd
-    }
-
-    return options[(id_1, id_2)](op_1, op_2)
-
-
-def is_op_before(op_1: Union[InsertOperation, DeleteOperation],
-                 op_2: Union[InsertOperation, DeleteOperation]) -> bool:
-    """Return whether or not op_1 is positioned before op_2."""
-
-    return op_1.position.row < op_2.position.row or (
-            op_1.position.row == op_1.position.row
-            and op_1.position.column < op_2.position.column)
-
-
-def is_op_same_pos(op_1: Union[InsertOperation, DeleteOperation],
-                   op_2: Union[InsertOperation, DeleteOperation]) -> bool:
-    """Return whether or not op_1 is positioned the same as op_2."""
-
-    return op_1.position.row == op_2.position.row and op_1.position.column == op_2.position.column
+    return _TRANSFORMS[op_1.kind][op_2.kind](op_1, op_2)
 
 
 def t_ii(op_1: InsertOperation, op_2: InsertOperation) -> InsertOperation:
@@ -242,23 +307,25 @@ def t_ii(op_1: InsertOperation, op_2: InsertOperation) -> InsertOperation:
     Assume that op_2 is executed first
     """
 
+    row_1, column_1 = op_1.position.row, op_1.position.column
+    row_2, column_2 = op_2.position.row, op_2.position.column
+
     # op_2 does not adjust indexes as it is
     # after op_1.
     # break ties by user identifier (no real order)
-    if is_op_before(op_1, op_2) or (is_op_same_pos(op_1, op_2) and op_1.author < op_2.author):
-        return InsertOperation(op_1.position, op_1.character, op_1.author)
+    if row_1 < row_2 or (row_1 == row_2 and (
+            column_1 < column_2 or (column_1 == column_2 and op_1.author < op_2.author))):
+        return op_1
     # op_2 occurs (in index) before op_1 so its execution
     # will push indexes forward by one; adjust accordingly
     else:
         if op_2.character == '\n':
-            return InsertOperation(
-                Position(op_1.position.row + 1, op_1.position.column), op_1.character, op_1.author)
+            return InsertOperation(Position(row_1 + 1, column_1), op_1.character, op_1.author)
         # Not \n
-        elif op_2.position.row == op_1.position.row:
-            return InsertOperation(
-                Position(op_1.position.row, op_1.position.column + 1), op_1.character, op_1.author)
+        elif row_2 == row_1:
+            return InsertOperation(Position(row_1, column_1 + 1), op_1.character, op_1.author)
         else:
-            return InsertOperation(op_1.position, op_1.character, op_1.author)
+            return op_1
 
 
 def t_id(op_1: InsertOperation, op_2: DeleteOperation) -> InsertOperation:
@@ -269,21 +336,22 @@ def t_id(op_1: InsertOperation, op_2: DeleteOperation) -> InsertOperation:
     Assume that op_2 is executed first
     """
 
+    row_1, column_1 = op_1.position.row, op_1.position.column
+    row_2, column_2 = op_2.position.row, op_2.position.column
+
     # Deletion from op_2 does not affect
     # the indexes for op_1. Make no changes
-    if is_op_before(op_1, op_2) or is_op_same_pos(op_1, op_2):
-        return InsertOperation(op_1.position, op_1.character, op_1.author)
+    if row_1 < row_2 or (row_1 == row_2 and column_1 <= column_2):
+        return op_1
     # Deletion from op_2 pushes op_1 indexes
     # back by one. Adjust accordingly
     else:
-        if op_2.position.column == -1:
-            return InsertOperation(
-                Position(op_1.position.row - 1, op_1.position.column), op_1.character, op_1.author)
-        elif op_2.position.row == op_1.position.row:
-            return InsertOperation(
-                Position(op_1.position.row, op_1.position.column - 1), op_1.character, op_1.author)
+        if column_2 == -1:
+            return InsertOperation(Position(row_1 - 1, column_1), op_1.character, op_1.author)
+        elif row_2 == row_1:
+            return InsertOperation(Position(row_1, column_1 - 1), op_1.character, op_1.author)
         else:
-            return InsertOperation(op_1.position, op_1.character, op_1.author)
+            return op_1
 
 
 def t_di(op_1: DeleteOperation, op_2: InsertOperation) -> DeleteOperation:
@@ -294,21 +362,22 @@ def t_di(op_1: DeleteOperation, op_2: InsertOperation) -> DeleteOperation:
     Assume that op_2 is executed first
     """
 
+    row_1, column_1 = op_1.position.row, op_1.position.column
+    row_2, column_2 = op_2.position.row, op_2.position.column
+
     # op_2 index position is after
     # op_1 so inserting does not affect
     # op_1 indexes
 
-    if is_op_before(op_1, op_2):
-        return DeleteOperation(op_1.position, op_1.author)
+    if row_1 < row_2 or (row_1 == row_2 and column_1 < column_2):
+        return op_1
     else:
         if op_2.character == '\n':
-            return DeleteOperation(
-                Position(op_1.position.row + 1, op_1.position.column), op_1.author)
-        elif op_2.position.row == op_1.position.row:
-            return DeleteOperation(
-                Position(op_1.position.row, op_1.position.column + 1), op_1.author)
+            return DeleteOperation(Position(row_1 + 1, column_1), op_1.author)
+        elif row_2 == row_1:
+            return DeleteOperation(Position(row_1, column_1 + 1), op_1.author)
         else:
-            return DeleteOperation(op_1.position, op_1.author)
+            return op_1
 
 
 def t_dd(op_1: DeleteOperation, op_2: DeleteOperation) -> \
@@ -320,23 +389,38 @@ def t_dd(op_1: DeleteOperation, op_2: DeleteOperation) -> \
     Assume that op_2 is executed first
     """
 
+    row_1, column_1 = op_1.position.row, op_1.position.column
+    row_2, column_2 = op_2.position.row, op_2.position.column
+
     # Deletion from op_2 does not affect
     # the indexes for op_1. Make no changes
 
-    if is_op_before(op_1, op_2):
-        return DeleteOperation(op_1.position, op_1.author)
-    elif not is_op_same_pos(op_1, op_2):
-        if op_2.position.column == -1:
-            return DeleteOperation(
-                Position(op_1.position.row - 1, op_1.position.column), op_1.author)
-        elif op_2.position.row == op_1.position.row:
-            return DeleteOperation(
-                Position(op_1.position.row, op_1.position.column - 1), op_1.author)
+    if row_1 < row_2 or (row_1 == row_2 and column_1 < column_2):
+        return op_1
+    elif row_1 != row_2 or column_1 != column_2:
+        if column_2 == -1:
+            return DeleteOperation(Position(row_1 - 1, column_1), op_1.author)
+        elif row_2 == row_1:
+            return DeleteOperation(Position(row_1, column_1 - 1), op_1.author)
         else:
-            return DeleteOperation(op_1.position, op_1.author)
+            return op_1
     else:
         # They are the same deletion!
         return IdentityOperation(op_1.author)
 
 
+def t_noop(op_1: Operation, op_2: Operation) -> Operation:
+    """Return op_1 unchanged, as an identity operation
+    on either side leaves the other as it is.
+    """
+
+    return op_1
+
 
+# The transform of op_1 against op_2 for each pair of kinds,
+# indexed by [op_1.kind][op_2.kind]
+_TRANSFORMS = (
+    (t_ii, t_id, t_noop),
+    (t_di, t_dd, t_noop),
+    (t_noop, t_noop, t_noop)
+)